@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hashlib
+import pickle
+import typing as t
+from dataclasses import dataclass
+
+from no_log_tears import LogMixin
+
+from pywallet.date import get_utc_now
+
+if t.TYPE_CHECKING:
+    from datetime import datetime, timedelta
+    from pathlib import Path
+
+
+class FileCache[V](LogMixin):
+    @dataclass(frozen=True, kw_only=True, slots=True)
+    class Entry[T]:
+        created_at: datetime
+        ttl: timedelta | None
+        value: T
+
+        @property
+        def expired(self) -> bool:
+            return self.ttl is not None and self.created_at + self.ttl < get_utc_now()
+
+    def __init__(self, root: Path) -> None:
+        self.__root = root
+
+    def get(self, namespace: str, name: str) -> V | None:
+        log = self._log(namespace=namespace, name=name)
+        path = self.__get_path(namespace, name)
+
+        try:
+            entry: FileCache.Entry[V] = pickle.loads(path.read_bytes())  # noqa: S301
+
+        except FileNotFoundError:
+            log.debug("cache miss")
+            return None
+
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as err:
+            # NOTE: logger adapter passes all keyword arguments as record extra values, so `exc_info` can't be used here
+            log.warning("cache entry is broken", error=err)
+            path.unlink(missing_ok=True)
+            return None
+
+        if entry.expired:
+            log.debug("cache entry expired", created_at=entry.created_at, ttl=entry.ttl)
+            path.unlink(missing_ok=True)
+            return None
+
+        log.debug("cache hit")
+        return entry.value
+
+    def set(self, namespace: str, name: str, value: V, ttl: timedelta | None = None) -> None:
+        path = self.__get_path(namespace, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first, so concurrent readers never see a partially written entry
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(pickle.dumps(FileCache.Entry(created_at=get_utc_now(), ttl=ttl, value=value)))
+        tmp_path.replace(path)
+
+        self._log.debug("cache entry set", namespace=namespace, name=name, ttl=ttl)
+
+    def __get_path(self, namespace: str, name: str) -> Path:
+        return self.__root / hashlib.md5(namespace.encode(), usedforsecurity=False).hexdigest() / f"{name}.pkl"
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from argparse import ArgumentTypeError
+
+
+def parse_positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        msg = f"value should be a positive integer, got {number}"
+        raise ArgumentTypeError(msg)
+
+    return number
@@ -1,52 +1,72 @@
 from __future__ import annotations
 
+import json
 import re
 import shutil
 import typing as t
 from collections import OrderedDict
 from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import date, timedelta
 from decimal import Decimal
-from functools import cache
-from pathlib import Path
 from time import sleep
 
 import tqdm
 from no_log_tears import LogMixin, get_logger
-from pydantic import BaseModel, Field, RootModel, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chromium.options import ChromiumOptions
 from selenium.webdriver.chromium.webdriver import ChromiumDriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
 from yarl import URL
 
+from pywallet.config import BrowserDriver, ClientConfig
 from pywallet.date import DatePeriod
 from pywallet.money import Money
 
 if t.TYPE_CHECKING:
+    from datetime import date
+    from pathlib import Path
+
+    from selenium.webdriver.common.options import ArgOptions
     from selenium.webdriver.remote.webdriver import WebDriver
     from selenium.webdriver.remote.webelement import WebElement
 
 
-class ClientConfig(BaseModel):
-    budgetbackers_host: str = "web.budgetbakers.com"
-    budgetbackers_email: str
-    budgetbackers_password: SecretStr
-
-    browser_driver: t.Literal["firefox", "chrome", "chromium", "edge", "ie", "safari"] = "firefox"
-    browser_page_implicit_wait: timedelta = timedelta(seconds=30)
-    browser_headless: bool = True
-    browser_data_dir: Path = Path.cwd() / ".local" / "pywallet" / "browser"
-    browser_args: t.Sequence[str] = Field(default_factory=tuple)
-
-    login_progress: bool = True
-
-
-@dataclass(frozen=True, kw_only=True)
+_LOGIN_FORM_XPATH = "/html/body/div[1]/div/div/section/div/form"
+_LOGIN_SUBMIT_XPATH = ".//button[@type='submit']"
+_SYNCHRONIZATION_XPATH = "//*[text()='Synchronization']"
+_DASHBOARD_LINK_XPATH = "//a[@href='/dashboard']"
+_USERNAME_XPATH = "/html/body/div[1]/div/div/div[1]/div/div/div/div/div[1]/div[2]/span[1]"
+_ANALYTICS_LINK_XPATH = "//a[@href='/analytics']"
+_DATE_RANGE_MONTHS_XPATH = ".//*[text()='Months']"
+_DATE_RANGE_YEAR_XPATH = "./div/div"
+_DATE_RANGE_MONTH_SELECTOR = ":scope > ul > li"
+
+_REPORT_ROW_SELECTOR = ".report-row-values"
+_REPORT_ROW_CATEGORY_SELECTOR = ".category-name"
+_REPORT_ROW_AMOUNT_SELECTOR = "td:nth-child(2) > strong > span"
+
+# reads all rows of the report table in a single webdriver call, returns `[category, amount]` pairs.
+_READ_REPORT_ROWS_SCRIPT = f"""
+return Array.from(arguments[0].querySelectorAll('{_REPORT_ROW_SELECTOR}')).map(row => [
+    row.querySelector('{_REPORT_ROW_CATEGORY_SELECTOR}').innerText.trim(),
+    row.querySelector('{_REPORT_ROW_AMOUNT_SELECTOR}').innerText.trim(),
+]);
+"""
+
+# finds the first descendant element that has a text node equal to the specified text (as XPath `text()='...'` does).
+_FIND_ELEMENT_BY_TEXT_SCRIPT = """
+return Array.from(arguments[0].querySelectorAll('*')).find(el => Array.from(el.childNodes).some(
+    node => node.nodeType === Node.TEXT_NODE && node.textContent === arguments[1]
+)) || null;
+"""
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
 class IncomesExpensesReport:
-    @dataclass(frozen=True, kw_only=True)
+    @dataclass(frozen=True, kw_only=True, slots=True)
     class Row:
         category: str
         total: Money
@@ -58,59 +78,73 @@ class IncomesExpensesReport:
     expenses: t.Mapping[str, Row]
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class IncomesExpensesReportOptions:
     filter_name: str | None = None
 
 
-@cache
-def _get_money_pattern() -> t.Pattern[str]:
-    return re.compile(r"^(?P<sign>[+-])?(?P<currency>\D+)(?P<amount>[0-9,.]+)$")
+_MONEY_MATCH = re.compile(r"^([+-])?(\D+)([0-9,.]+)$").match
+_MONEY_AMOUNT_TRANSLATION = str.maketrans({",": None})
 
 
 def parse_money(value: str) -> Money:
-    match = _get_money_pattern().match(value)
+    match = _MONEY_MATCH(value)
     if match is None:
         msg = "value doesn't match money pattern"
         raise ValueError(msg, value)
 
+    sign, currency, amount = match.groups()
+
     return Money(
-        currency=match.group("currency"),
-        amount=Decimal((match.group("sign") or "") + match.group("amount").replace(",", "")),
+        currency=currency,
+        amount=Decimal((sign or "") + amount.translate(_MONEY_AMOUNT_TRANSLATION)),
     )
 
 
-class BrowserCookies(RootModel[t.Sequence[t.Mapping[str, object]]]):
-    pass
-
-
 class Client(LogMixin):
     def __init__(self, base_url: URL, driver: WebDriver) -> None:
         self.__base_url = base_url
         self.__driver = driver
+        self.__analytics_opened = False
 
     def load_cookies(self, path: Path) -> None:
         log = self._log(path=path)
         log.debug("loading cookies")
 
-        if not path.is_file():
+        cookies_path = path / "cookies.json"
+        if not cookies_path.is_file():
             log.warning("cookies file path is not valid")
             return
 
-        self.__open_url()
+        cookies: t.Sequence[dict[str, object]] = json.loads(cookies_path.read_bytes())
+
+        if isinstance(self.__driver, ChromiumDriver):
+            # set all cookies in one call, CDP names selenium `expiry` cookie field as `expires`
+            self.__driver.execute_cdp_cmd(
+                "Network.setCookies",
+                {
+                    "cookies": [
+                        {("expires" if key == "expiry" else key): value for key, value in cookie.items()}
+                        for cookie in cookies
+                    ],
+                },
+            )
 
-        for cookie in BrowserCookies.model_validate_json((path / "cookies.json").read_bytes()).root:
-            self.__driver.add_cookie(cookie)
+        else:
+            # webdriver allows to add cookies only for currently opened domain
+            self.__open_url()
 
-        self.__driver.refresh()
+            for cookie in cookies:
+                self.__driver.add_cookie(cookie)
 
+        # NOTE: page is not refreshed, cookies are applied on the next opened url (e.g. on login)
         log.info("cookies loaded")
 
     def dump_cookies(self, path: Path) -> None:
         log = self._log(path=path)
 
         path.mkdir(parents=True, exist_ok=True)
-        (path / "cookies.json").write_text(BrowserCookies(root=self.__driver.get_cookies()).model_dump_json())
+        (path / "cookies.json").write_text(json.dumps(self.__driver.get_cookies()))
 
         log.info("cookies dumped")
 
@@ -123,14 +157,14 @@ class Client(LogMixin):
             log.debug("login page opened")
             pb.update()
 
-            login_form = self.__driver.find_element(By.XPATH, "/html/body/div[1]/div/div/section/div/form")
+            login_form = self.__driver.find_element(By.XPATH, _LOGIN_FORM_XPATH)
             if "Log In" not in login_form.text:
                 msg = "login form was not found"
                 raise RuntimeError(msg, login_form.text)
 
             email_el = login_form.find_element(By.NAME, "email")
             password_el = login_form.find_element(By.NAME, "password")
-            login_btn = login_form.find_element(By.XPATH, ".//button[@type='submit']")
+            login_btn = login_form.find_element(By.XPATH, _LOGIN_SUBMIT_XPATH)
 
             email_el.send_keys(email)
             password_el.send_keys(password)
@@ -138,14 +172,12 @@ class Client(LogMixin):
             log.debug("login form filled")
             pb.update()
 
-            self.__driver.find_element(By.XPATH, "//*[text()='Synchronization']")
+            self.__driver.find_element(By.XPATH, _SYNCHRONIZATION_XPATH)
             log.debug("loading")
             pb.update()
 
-            self.__driver.find_element(By.XPATH, "//a[@href='/dashboard']")
-            username_span = self.__driver.find_element(
-                By.XPATH, "/html/body/div[1]/div/div/div[1]/div/div/div/div/div[1]/div[2]/span[1]"
-            )
+            self.__driver.find_element(By.XPATH, _DASHBOARD_LINK_XPATH)
+            username_span = self.__driver.find_element(By.XPATH, _USERNAME_XPATH)
             log.info("logged in", username=username_span.text)
             pb.update()
 
@@ -157,10 +189,7 @@ class Client(LogMixin):
         log = self._log(month=month)
         log.debug("trying to read incomes expenses report for month")
 
-        analytics_btn = self.__driver.find_element(By.XPATH, "//a[@href='/analytics']")
-        analytics_btn.click()
-
-        self.__analytics_select_incomes_expenses_report()
+        self.__analytics_open()
         self.__analytics_select_month(month)
         log.debug("month selected")
 
@@ -171,10 +200,12 @@ class Client(LogMixin):
         report_container = self.__driver.find_element(By.CLASS_NAME, "report-content")
         (incomes_report_table, expenses_report_table) = report_container.find_elements(By.CLASS_NAME, "report-table")
 
-        title = report_container.find_element(By.CLASS_NAME, "totals").find_element(By.CLASS_NAME, "title").text
+        totals = report_container.find_element(By.CLASS_NAME, "totals")
+
+        title = totals.find_element(By.CLASS_NAME, "title").text
         log.debug("title was parsed", title=title)
 
-        total_value = report_container.find_element(By.CLASS_NAME, "totals").find_element(By.CLASS_NAME, "value").text
+        total_value = totals.find_element(By.CLASS_NAME, "value").text
 
         report = IncomesExpensesReport(
             title=title,
@@ -188,6 +219,9 @@ class Client(LogMixin):
 
         return report
 
+    def refresh_analytics(self) -> None:
+        self.__analytics_opened = False
+
     def __open_url(self, *parts: str) -> None:
         url = str(self.__base_url.with_scheme("https").joinpath(*parts))
         self.__driver.get(url)
@@ -199,18 +233,38 @@ class Client(LogMixin):
     ) -> OrderedDict[str, IncomesExpensesReport.Row]:
         rows = OrderedDict[str, IncomesExpensesReport.Row]()
 
-        for table_row in table.find_elements(By.CLASS_NAME, "report-row-values"):
-            category_span = table_row.find_element(By.CLASS_NAME, "category-name")
-            amount = table_row.find_element(By.XPATH, "./td[2]/strong/span")
+        # script returns rows that are rendered at the moment, so wait until table has rows (as implicit wait does for
+        # `find_elements`), table without rows is empty after the wait
+        try:
+            values: t.Sequence[tuple[str, str]] = WebDriverWait(
+                self.__driver,
+                timeout=self.__driver.timeouts.implicit_wait,
+            ).until(lambda driver: driver.execute_script(_READ_REPORT_ROWS_SCRIPT, table))
+
+        except TimeoutException:
+            self._log.debug("report table has no rows")
+            return rows
 
+        for category, amount in values:
             row = IncomesExpensesReport.Row(
-                category=category_span.text,
-                total=parse_money(amount.text),
+                category=category,
+                total=parse_money(amount),
             )
             rows[row.category] = row
 
         return rows
 
+    def __analytics_open(self) -> None:
+        if self.__analytics_opened:
+            return
+
+        analytics_btn = self.__driver.find_element(By.XPATH, _ANALYTICS_LINK_XPATH)
+        analytics_btn.click()
+
+        self.__analytics_select_incomes_expenses_report()
+        self.__analytics_opened = True
+        self._log.debug("analytics opened")
+
     def __analytics_select_incomes_expenses_report(self) -> None:
         pass
 
@@ -219,39 +273,42 @@ class Client(LogMixin):
         date_range_picker.click()
 
         date_range_picker_container = self.__driver.find_element(By.CLASS_NAME, "date-range-picker-container")
-        months_btn = date_range_picker_container.find_element(By.XPATH, ".//*[text()='Months']")
+        months_btn = date_range_picker_container.find_element(By.XPATH, _DATE_RANGE_MONTHS_XPATH)
         months_btn.click()
 
         date_range_month_picker_container = date_range_picker_container.find_element(
             By.CLASS_NAME,
             "date-range-picker-month-year-content",
         )
-        date_range_year = None
+        date_range_year_name = date_range_month_picker_container.find_element(By.XPATH, _DATE_RANGE_YEAR_XPATH)
+        year_delta = month.year - int(date_range_year_name.text)
 
-        while date_range_year != month.year:
-            date_range_year_name = date_range_month_picker_container.find_element(By.XPATH, "./div/div")
-            date_range_year = int(date_range_year_name.text)
-
-            if date_range_year > month.year:
-                change_range = date_range_month_picker_container.find_element(By.CLASS_NAME, "left")
-                change_range.click()
-
-            elif date_range_year < month.year:
-                change_range = date_range_month_picker_container.find_element(By.CLASS_NAME, "right")
-                change_range.click()
+        if year_delta:
+            change_range = date_range_month_picker_container.find_element(
+                By.CLASS_NAME,
+                "right" if year_delta > 0 else "left",
+            )
+            for _ in range(abs(year_delta)):
+                self.__driver.execute_script("arguments[0].click();", change_range)
 
-            else:
-                break
+            date_range_year_name = date_range_month_picker_container.find_element(By.XPATH, _DATE_RANGE_YEAR_XPATH)
+            date_range_year = int(date_range_year_name.text)
+            if date_range_year != month.year:
+                msg = "failed to select year in date range picker"
+                raise RuntimeError(msg, date_range_year, month)
 
-        month_el = date_range_month_picker_container.find_element(By.XPATH, f"./ul/li[{month.month}]")
-        month_el.click()
+        month_els = date_range_month_picker_container.find_elements(By.CSS_SELECTOR, _DATE_RANGE_MONTH_SELECTOR)
+        month_els[month.month - 1].click()
 
     def __analytics_select_filter_name(self, name: str | None) -> None:
         if name:
             filter_selector = self.__driver.find_element(By.NAME, "selectFilter")
             filter_selector.click()
 
-            specific_filter = filter_selector.find_element(By.XPATH, f".//*[text()='{name}']")
+            specific_filter: WebElement = WebDriverWait(
+                self.__driver,
+                timeout=self.__driver.timeouts.implicit_wait,
+            ).until(lambda driver: driver.execute_script(_FIND_ELEMENT_BY_TEXT_SCRIPT, filter_selector, name))
             specific_filter.click()
 
 
@@ -282,92 +339,40 @@ def create_client(config: ClientConfig) -> t.Iterator[Client]:
 
 
 def create_webdriver(config: ClientConfig) -> WebDriver:
-    if config.browser_driver == "firefox":
-        return create_firefox_webdriver(config)
+    create_options, create_driver = _WEBDRIVERS[config.browser_driver]
 
-    elif config.browser_driver == "chrome":
-        return create_chrome_webdriver(config)
-
-    elif config.browser_driver == "chromium":
-        return create_chromium_webdriver(config)
-
-    elif config.browser_driver == "edge":
-        return create_edge_webdriver(config)
-
-    elif config.browser_driver == "ie":
-        return create_ie_webdriver(config)
-
-    elif config.browser_driver == "safari":
-        return create_safari_webdriver(config)
-
-    else:
-        t.assert_never(config.browser_driver)
-
-
-def create_firefox_webdriver(config: ClientConfig) -> WebDriver:
-    options = webdriver.FirefoxOptions()
+    options = create_options()
     options.add_argument(f"--user-data-dir={config.browser_data_dir.absolute()}")
     if config.browser_headless:
         options.add_argument("--headless")
     for arg in config.browser_args:
         options.add_argument(arg)
-    service = webdriver.FirefoxService(executable_path=shutil.which("geckodriver"))
-    return webdriver.Firefox(options=options, service=service)
-
-
-def create_chrome_webdriver(config: ClientConfig) -> WebDriver:
-    options = webdriver.ChromeOptions()
-    options.add_argument(f"--user-data-dir={config.browser_data_dir.absolute()}")
-    if config.browser_headless:
-        options.add_argument("--headless")
-    for arg in config.browser_args:
-        options.add_argument(arg)
-
-    return webdriver.Chrome(options=options)
-
-
-def create_chromium_webdriver(config: ClientConfig) -> WebDriver:
-    options = ChromiumOptions()
-    options.add_argument(f"--user-data-dir={config.browser_data_dir.absolute()}")
-    if config.browser_headless:
-        options.add_argument("--headless")
-    for arg in config.browser_args:
-        options.add_argument(arg)
-
-    return ChromiumDriver(options=options)
 
+    return create_driver(options=options)
 
-def create_edge_webdriver(config: ClientConfig) -> WebDriver:
-    options = webdriver.EdgeOptions()
-    options.add_argument(f"--user-data-dir={config.browser_data_dir.absolute()}")
-    if config.browser_headless:
-        options.add_argument("--headless")
-    for arg in config.browser_args:
-        options.add_argument(arg)
 
-    return webdriver.Edge(options=options)
+def create_firefox_webdriver(options: webdriver.FirefoxOptions) -> WebDriver:
+    service = webdriver.FirefoxService(executable_path=shutil.which("geckodriver"))
+    return webdriver.Firefox(options=options, service=service)
 
 
-def create_ie_webdriver(config: ClientConfig) -> WebDriver:
-    options = webdriver.IeOptions()
-    options.add_argument(f"--user-data-dir={config.browser_data_dir.absolute()}")
-    if config.browser_headless:
-        options.add_argument("--headless")
-    for arg in config.browser_args:
-        options.add_argument(arg)
+def create_chromium_webdriver(options: ChromiumOptions) -> WebDriver:
+    return ChromiumDriver(browser_name="chrome", vendor_prefix="goog", options=options)
 
-    return webdriver.Ie(options=options)
 
+# options must be passed by keyword, e.g. safari webdriver doesn't accept them as the first positional argument
+class _WebDriverFactory(t.Protocol):
+    def __call__(self, *, options: t.Any) -> WebDriver: ...
 
-def create_safari_webdriver(config: ClientConfig) -> WebDriver:
-    options = webdriver.SafariOptions()
-    options.add_argument(f"--user-data-dir={config.browser_data_dir.absolute()}")
-    if config.browser_headless:
-        options.add_argument("--headless")
-    for arg in config.browser_args:
-        options.add_argument(arg)
 
-    return webdriver.Safari(options=options)
+_WEBDRIVERS: t.Mapping[BrowserDriver, tuple[t.Callable[[], ArgOptions], _WebDriverFactory]] = {
+    "firefox": (webdriver.FirefoxOptions, create_firefox_webdriver),
+    "chrome": (webdriver.ChromeOptions, webdriver.Chrome),
+    "chromium": (ChromiumOptions, create_chromium_webdriver),
+    "edge": (webdriver.EdgeOptions, webdriver.Edge),
+    "ie": (webdriver.IeOptions, webdriver.Ie),
+    "safari": (webdriver.SafariOptions, webdriver.Safari),
+}
 
 
 def main() -> None:
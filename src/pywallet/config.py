@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import typing as t
+from datetime import timedelta
+from pathlib import Path
+
+from pydantic import BaseModel, Field, SecretStr
+
+type BrowserDriver = t.Literal["firefox", "chrome", "chromium", "edge", "ie", "safari"]
+
+
+class ClientConfig(BaseModel):
+    budgetbackers_host: str = "web.budgetbakers.com"
+    budgetbackers_email: str
+    budgetbackers_password: SecretStr
+
+    browser_driver: BrowserDriver = "firefox"
+    browser_page_implicit_wait: timedelta = timedelta(seconds=30)
+    browser_headless: bool = True
+    browser_data_dir: Path = Path.cwd() / ".local" / "pywallet" / "browser"
+    browser_args: t.Sequence[str] = Field(default_factory=tuple)
+
+    login_progress: bool = True
@@ -1,20 +1,34 @@
+import os
 import typing as t
 from argparse import ArgumentParser, BooleanOptionalAction
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, replace
 from datetime import datetime
 from decimal import Decimal
+from functools import cache
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pdfplumber
 import tabula
 import tqdm
 import yaml
 from pdfplumber import PDF
+from pdfplumber.page import Page
+from pdfplumber.utils.text import DEFAULT_X_TOLERANCE, WordExtractor
 from pydantic import BaseModel
 
+from pywallet.cli import parse_positive_int
+from pywallet.csv import use_csv_writer
 
-@dataclass(frozen=True, kw_only=True)
+type ColumnType = t.Literal["bool", "int", "float", "str", "date", "money"]
+type TableExtractor = t.Literal["tabula", "pdfplumber"]
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
 class Area:
     left: float = 0
     top: float = 0
@@ -32,7 +46,7 @@ class PDFOptions(BaseModel):
                 join: JoinOptions | None = None
 
             name: str
-            type: t.Literal["bool", "int", "float", "str", "date", "money"] = "str"
+            type: ColumnType = "str"
             required: bool = True
             rename: str | None
             ignore_values: t.Sequence[object] | None = None
@@ -43,6 +57,9 @@ class PDFOptions(BaseModel):
         include_footer: bool = False
         offset: Area | None = None
         word_join_tolerance: int | None = None
+        # pdfplumber doesn't need java, but it may split cells & rows differently than tabula, pages where pdfplumber
+        # finds no table with the expected columns are read with tabula
+        extractor: TableExtractor = "tabula"
 
     table: TableOptions | None = None
 
@@ -63,14 +80,15 @@ class ConvertOptions(BaseModel):
     write: WriteOptions
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class PDFWordSearchOptions:
     exact_match: str | None = None
     substr: str | None = None
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class PDFWordSearchResult(Area):
+    search: PDFWordSearchOptions
     word: str
     page: int
 
@@ -78,18 +96,31 @@ class PDFWordSearchResult(Area):
 def search_words_in_pdf(
     doc: PDF,
     searches: t.Sequence[PDFWordSearchOptions],
-    word_join_tolerance: int,
+    word_join_tolerance: int | None,
 ) -> t.Iterable[PDFWordSearchResult]:
+    exact_matches = {search.exact_match: search for search in searches if search.exact_match}
+    substr_searches = [search for search in searches if search.substr]
+    texts = [*exact_matches.keys(), *(search.substr for search in substr_searches if search.substr)]
+
+    extractor = WordExtractor(
+        x_tolerance=word_join_tolerance if word_join_tolerance is not None else DEFAULT_X_TOLERANCE,
+        keep_blank_chars=True,
+    )
+
     for page in tqdm.tqdm(doc.pages, desc=f"Searching words in PDF {doc.path}"):
-        words = page.extract_words(x_tolerance=word_join_tolerance, keep_blank_chars=True)
+        words_by_text = dict[str, list[dict[str, t.Any]]]()
+        for word in extract_pdf_page_words_on_lines_with(page, extractor, texts):
+            words_by_text.setdefault(word["text"], []).append(word)
 
-        for search in searches:
-            for word in words:
-                if (search.exact_match and word["text"] == search.exact_match) or (
-                    search.substr and search.substr in word["text"]
-                ):
+        for text, words in words_by_text.items():
+            matched = [exact_matches[text]] if text in exact_matches else []
+            matched.extend(search for search in substr_searches if search.substr and search.substr in text)
+
+            for search in matched:
+                for word in words:
                     yield PDFWordSearchResult(
-                        word=word["text"],
+                        search=search,
+                        word=text,
                         page=page.page_number,
                         left=word["x0"],
                         top=word["top"],
@@ -98,69 +129,142 @@ def search_words_in_pdf(
                     )
 
 
-def get_table_areas_by_pages(path: Path, options: PDFOptions.TableOptions) -> t.Mapping[int, Area]:
-    areas = dict[int, Area]()
-
-    with pdfplumber.open(path) as doc:
-        for search in search_words_in_pdf(
-            doc,
-            [PDFWordSearchOptions(exact_match=col.name) for col in options.columns if col.required],
-            word_join_tolerance=options.word_join_tolerance,
-        ):
-            page = doc.pages[search.page - 1]
-            area = areas.get(search.page)
-
-            if area is None:
-                area = areas[search.page] = Area(right=page.width, bottom=page.height)
-
-            areas[search.page] = replace(area, top=max(area.top, search.top))
-
-        for search in search_words_in_pdf(
-            doc,
-            [PDFWordSearchOptions(substr=footer) for footer in options.footers],
-            word_join_tolerance=options.word_join_tolerance,
-        ):
-            area = areas.get(search.page)
-            if area is None:
+def extract_pdf_page_words_on_lines_with(
+    page: Page,
+    extractor: WordExtractor,
+    texts: t.Sequence[str],
+) -> t.Iterable[dict[str, t.Any]]:
+    # Yields the same words as `page.extract_words` does, but words are built only on text lines, that contain any of
+    # the specified texts. Each word text is a part of its line text, so no matching word can be skipped.
+    for _, chars in groupby(page.chars, itemgetter("upright")):
+        for line_chars, direction in extractor.iter_chars_to_lines(chars):
+            line_text = "".join(extractor.expansions.get(char["text"], char["text"] or "") for char in line_chars)
+            if not any(text in line_text for text in texts):
                 continue
 
-            areas[search.page] = replace(
-                area,
-                bottom=min(area.bottom, search.bottom if options.include_footer else search.top),
-            )
+            for word_chars in extractor.iter_chars_to_words(line_chars, direction):
+                yield extractor.merge_chars(word_chars)
+
+
+def get_table_areas_by_pages(doc: PDF, options: PDFOptions.TableOptions) -> t.Mapping[int, Area]:
+    areas = dict[int, Area]()
+    headers = [PDFWordSearchOptions(exact_match=col.name) for col in options.columns if col.required]
+    footers = [PDFWordSearchOptions(substr=footer) for footer in options.footers or ()]
+
+    found_headers = list[PDFWordSearchResult]()
+    found_footers = list[PDFWordSearchResult]()
+
+    for search in search_words_in_pdf(
+        doc,
+        [*headers, *footers],
+        word_join_tolerance=options.word_join_tolerance,
+    ):
+        if search.search.exact_match is not None:
+            found_headers.append(search)
+        else:
+            found_footers.append(search)
+
+    for search in found_headers:
+        page = doc.pages[search.page - 1]
+        area = areas.get(search.page)
+
+        if area is None:
+            area = areas[search.page] = Area(right=page.width, bottom=page.height)
+
+        areas[search.page] = replace(area, top=max(area.top, search.top))
+
+    for search in found_footers:
+        area = areas.get(search.page)
+        if area is None:
+            continue
+
+        areas[search.page] = replace(
+            area,
+            bottom=min(area.bottom, search.bottom if options.include_footer else search.top),
+        )
 
     return areas
 
 
-def read_pdf_table(path: Path, options: PDFOptions.TableOptions) -> pd.DataFrame:
-    areas = get_table_areas_by_pages(path, options)
+def read_pdf_table(path: Path, options: PDFOptions.TableOptions, jobs: int | None = None) -> pd.DataFrame:
+    tables = dict[int, t.Sequence[pd.DataFrame]]()
+
+    offset = options.offset or Area()
 
-    return pd.concat(
-        objs=(
-            merge_multiline_rows(table, options)
-            for page, area in tqdm.tqdm(
-                areas.items(),
-                desc=f"reading tables on each page of PDF {path}",
+    with pdfplumber.open(path) as doc:
+        areas = {
+            page: Area(
+                left=area.left + offset.left,
+                top=area.top + offset.top,
+                right=area.right + offset.right,
+                bottom=area.bottom + offset.bottom,
             )
-            for table in tabula.read_pdf(
-                input_path=path,
-                pages=page,
-                area=[
-                    area.top + options.offset.top,
-                    area.left + options.offset.left,
-                    area.bottom + options.offset.bottom,
-                    area.right + options.offset.right,
-                ],
-                multiple_tables=False,
-                silent=True,
-                force_subprocess=True,
-                pandas_options={"header": None},
+            for page, area in get_table_areas_by_pages(doc, options).items()
+        }
+
+        if options.extractor == "pdfplumber":
+            for page, area in tqdm.tqdm(areas.items(), desc=f"extracting tables on each page of PDF {path}"):
+                table = extract_pdf_page_table(doc.pages[page - 1], area, options.word_join_tolerance)
+                if table is not None and table.shape[1] == len(options.columns):
+                    tables[page] = [table]
+
+    fallback_areas = {page: area for page, area in areas.items() if page not in tables}
+
+    # each tabula call blocks on a java subprocess, so threads are enough to read pages concurrently
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        tables.update(
+            zip(
+                fallback_areas.keys(),
+                tqdm.tqdm(
+                    executor.map(
+                        lambda page, area: read_pdf_page_tables_with_tabula(path, page, area),
+                        fallback_areas.keys(),
+                        fallback_areas.values(),
+                    ),
+                    desc=f"reading tables with tabula on pages of PDF {path}",
+                    total=len(fallback_areas),
+                ),
+                strict=True,
             )
-        ),
-        ignore_index=True,
+        )
+
+    return pd.DataFrame(
+        data=[row for page in sorted(tables) for table in tables[page] for row in merge_multiline_rows(table, options)],
+        columns=[col.rename or col.name for col in options.columns],
     )
 
 
+def extract_pdf_page_table(page: Page, area: Area, word_join_tolerance: int | None) -> pd.DataFrame | None:
+    rows = page.crop((area.left, area.top, area.right, area.bottom), strict=False).extract_table(
+        # text strategies split table rows by text lines, just like tabula stream mode does
+        table_settings={
+            "vertical_strategy": "text",
+            "horizontal_strategy": "text",
+            "text_keep_blank_chars": True,
+            "text_x_tolerance": word_join_tolerance if word_join_tolerance is not None else DEFAULT_X_TOLERANCE,
+        },
+    )
+    if rows is None:
+        return None
+
+    return pd.DataFrame([[value or None for value in row] for row in rows if any(row)])
+
+
+def read_pdf_page_tables_with_tabula(path: Path, page: int, area: Area) -> t.Sequence[pd.DataFrame]:
+    tables = tabula.read_pdf(
+        input_path=path,
+        pages=page,
+        area=[area.top, area.left, area.bottom, area.right],
+        multiple_tables=False,
+        silent=True,
+        force_subprocess=True,
+        pandas_options={"header": None},
+    )
+    assert isinstance(tables, list)
+
+    return tables
+
+
 def merge_row(row: t.Sequence[t.Sequence[object]], options: PDFOptions.TableOptions) -> t.Sequence[t.Sequence[object]]:
     if not row or any(not row[i] for i, col in enumerate(options.columns) if col.required):
         print("empty row", row)
@@ -187,70 +291,125 @@ def flatten[T](vals: t.Sequence[T]) -> T | None:
     return vals[0] if vals else None
 
 
-def parse_value(value: str, column: PDFOptions.TableOptions.ColumnOptions) -> object:
-    match column.type:
+@cache
+def _get_value_parser(kind: ColumnType) -> t.Callable[[str], object]:
+    match kind:
         case "bool":
-            match value.lower().strip():
-                case "true":
-                    return True
-                case "false":
-                    return False
-                case _:
-                    msg = "invalid bool value"
-                    raise ValueError(msg, value)
+            return parse_bool
 
         case "int":
-            return int(value)
+            return int
 
         case "float":
-            return float(value)
+            return float
 
         case "str":
-            return value
+            return str
 
         case "date":
-            return datetime.strptime(value, "%d.%m.%Y")
+            return parse_date
 
         case "money":
-            amount, _, currency = value.partition(" ")
-            return Decimal(amount.replace(",", ""))
+            return parse_money_amount
+
+        case _:
+            t.assert_never(kind)
+
 
+def parse_bool(value: str) -> bool:
+    match value.lower().strip():
+        case "true":
+            return True
+        case "false":
+            return False
         case _:
-            msg = "unknown column type"
-            raise ValueError(msg, column)
+            msg = "invalid bool value"
+            raise ValueError(msg, value)
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%d.%m.%Y")
 
 
-def merge_multiline_rows(table: pd.DataFrame, options: PDFOptions.TableOptions) -> pd.DataFrame:
+_MONEY_AMOUNT_TRANSLATION = str.maketrans({",": None})
+
+
+def parse_money_amount(value: str) -> Decimal:
+    amount, _, _ = value.partition(" ")
+    return Decimal(amount.translate(_MONEY_AMOUNT_TRANSLATION))
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class RowParser:
+    start: t.Callable[[t.Sequence[object], t.Sequence[bool]], list[list[object]]]
+    merge: t.Callable[[list[list[object]], t.Sequence[object], t.Sequence[bool]], None]
+
+
+@cache
+def _compile_row_parser(types: tuple[ColumnType, ...], merge_idx: tuple[int, ...]) -> RowParser:
+    # generates straight-line functions for the table schema, so no per cell dispatch by column options is done
+    start_cells = "".join(f"        [parse_{i}(values[{i}])] if notna[{i}] else [],\n" for i in range(len(types)))
+    merge_cells = "".join(f"    if notna[{i}]:\n        row[{i}].append(parse_{i}(values[{i}]))\n" for i in merge_idx)
+    source = (
+        f"def start(values, notna):\n    return [\n{start_cells}    ]\n\n"
+        f"def merge(row, values, notna):\n{merge_cells}    return None\n"
+    )
+
+    namespace: dict[str, t.Any] = {f"parse_{i}": _get_value_parser(kind) for i, kind in enumerate(types)}
+    exec(compile(source, "<pywallet row parser>", "exec"), namespace)  # noqa: S102
+
+    return RowParser(start=namespace["start"], merge=namespace["merge"])
+
+
+def merge_multiline_rows(table: pd.DataFrame, options: PDFOptions.TableOptions) -> t.Sequence[t.Sequence[object]]:
+    columns = options.columns
+    required_idx = np.array([i for i, col in enumerate(columns) if col.required], dtype=np.intp)
+    row_parser = _compile_row_parser(
+        tuple(col.type for col in columns),
+        tuple(i for i, col in enumerate(columns) if col.merge is not None),
+    )
+
+    values = table.to_numpy(dtype=object)
+    notna = table.notna().to_numpy()
+
+    keep = np.ones(len(values), dtype=np.bool_)
+    for i, col in enumerate(columns):
+        if col.ignore_values:
+            ignore_values = set(col.ignore_values)
+            keep &= np.fromiter(
+                (value not in ignore_values for value in values[:, i]), dtype=np.bool_, count=len(values)
+            )
+
+    values, notna = values[keep], notna[keep]
+
+    is_start = notna[:, required_idx].all(axis=1)
+    is_start[:1] = True
+    starts = np.flatnonzero(is_start)
+
     rows = list[t.Sequence[object]]()
     current_row: list[list[object]] | None = None
 
-    for _, row in table.iterrows():
-        if any(row[i] in col.ignore_values for i, col in enumerate(options.columns) if col.ignore_values):
-            continue
+    # the first split chunk is always empty, because the first row always starts a group
+    for group_values, group_notna in zip(np.split(values, starts)[1:], np.split(notna, starts)[1:], strict=True):
+        try:
+            start_row = row_parser.start(group_values[0], group_notna[0])
 
-        if not current_row or all(pd.notna(row[i]) for i, col in enumerate(options.columns) if col.required):
-            rows.extend(merge_row(current_row, options))
+        except ValueError as err:
+            print(group_values[0], err)
 
-            try:
-                current_row = [
-                    [parse_value(row[i], col)] if pd.notna(row[i]) else [] for i, col in enumerate(options.columns)
-                ]
+        else:
+            rows.extend(merge_row(current_row, options))
+            current_row = start_row
 
-            except ValueError as err:
-                print(row.values, err)
-                continue
+        if current_row is None:
+            continue
 
-        elif current_row:
-            for i, col in enumerate(options.columns):
-                if pd.notna(row[i]) and col.merge is not None:
-                    current_row[i].append(parse_value(row[i], col))
+        for row_values, row_notna in zip(group_values[1:], group_notna[1:], strict=True):
+            row_parser.merge(current_row, row_values, row_notna)
 
     rows.extend(merge_row(current_row, options))
 
-    return pd.DataFrame(
-        data=rows,
-        columns=[h.rename or h.name for h in options.columns],
-    )
+    return rows
 
 
 def build_parser() -> ArgumentParser:
@@ -276,6 +435,14 @@ def build_parser() -> ArgumentParser:
         help="Enable verbose / debug messages.",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=parse_positive_int,
+        default=None,
+        help="Amount of PDF pages to read concurrently. Default: depends on CPU count",
+    )
+
     parser.add_argument(
         "options",
         type=Path,
@@ -292,9 +459,9 @@ def build_parser() -> ArgumentParser:
     return parser
 
 
-def read_report(path: Path, options: ConvertOptions.ReadOptions) -> pd.DataFrame:
+def read_report(path: Path, options: ConvertOptions.ReadOptions, jobs: int | None = None) -> pd.DataFrame:
     if options.pdf is not None and options.pdf.table is not None:
-        return read_pdf_table(path, options.pdf.table)
+        return read_pdf_table(path, options.pdf.table, jobs)
 
     else:
         msg = "read options were not set"
@@ -306,17 +473,35 @@ def write_report(path: Path, df: pd.DataFrame, options: ConvertOptions.WriteOpti
         if options.csv.sort_by is not None:
             df = df.sort_values(by=options.csv.sort_by)
 
-        df.to_csv(
-            path_or_buf=path.with_suffix(".csv"),
-            columns=options.csv.columns,
-            index=options.csv.index,
-        )
+        if options.csv.columns is not None:
+            df = df[list(options.csv.columns)]
+
+        with use_csv_writer(
+            dest=path.with_suffix(".csv"),
+            header=["", *df.columns] if options.csv.index else list(df.columns),
+            # the same line endings & encoding as pandas `to_csv` writes
+            lineterminator=os.linesep,
+            encoding="utf-8",
+        ) as writer:
+            writer.writerows(iter_csv_rows(df, index=options.csv.index))
 
     else:
         msg = "write options were not set"
         raise ValueError(msg, options)
 
 
+def iter_csv_rows(df: pd.DataFrame, *, index: bool) -> t.Iterable[tuple[object, ...]]:
+    values = df.astype(object)
+
+    for name, column in df.items():
+        # keep pandas CSV formatting of dates, i.e. without time part when all values are at midnight
+        if pd.api.types.is_datetime64_any_dtype(column) and (column.dropna().dt.normalize() == column.dropna()).all():
+            # strftime may return pandas string dtype, which keeps NaN instead of None for missing values
+            values[name] = column.dt.strftime("%Y-%m-%d").astype(object)
+
+    return values.where(df.notna(), None).itertuples(index=index, name=None)
+
+
 def load_options(path: Path) -> ConvertOptions:
     return ConvertOptions.model_validate(yaml.safe_load(path.read_bytes()))
 
@@ -329,7 +514,7 @@ def main() -> None:
     paths: t.Sequence[Path] = ns.inputs
 
     for path in tqdm.tqdm(paths, desc="reading each PDF file"):
-        df = read_report(path, options.read)
+        df = read_report(path, options.read, ns.jobs)
         write_report(path, df, options.write)
 
 
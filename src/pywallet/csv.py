@@ -1,24 +1,114 @@
 from __future__ import annotations
 
 import csv
+import locale
+import re
 import sys
 import typing as t
 from contextlib import contextmanager, nullcontext
+from functools import cache
 from pathlib import Path
 
+CSV_WRITE_BUFFER_SIZE = 1 << 20
+CSV_LINE_TERMINATOR = "\r\n"
+
+
+class RowWriter(t.Protocol):
+    # csv.writer accepts any values, unquoted writer accepts only strings
+    def writerow(self, row: t.Iterable[t.Any], /) -> object: ...
+
+    def writerows(self, rows: t.Iterable[t.Iterable[t.Any]], /) -> None: ...
+
+
+# writes rows the same way as `csv.writer` does, but without per field quoting checks, encoded rows are collected in
+# a buffer and passed to binary output in large chunks
+class UnquotedRowWriter:
+    def __init__(self, output: t.BinaryIO, delimiter: str, lineterminator: str, encoding: str) -> None:
+        self.__output = output
+        self.__delimiter = delimiter
+        self.__lineterminator = lineterminator
+        self.__encoding = encoding
+        self.__buffer = bytearray()
+
+    def writerow(self, row: t.Iterable[str]) -> None:
+        self.__buffer += (self.__delimiter.join(row) + self.__lineterminator).encode(self.__encoding)
+        if len(self.__buffer) >= CSV_WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def writerows(self, rows: t.Iterable[t.Iterable[str]]) -> None:
+        buffer = self.__buffer
+        join = self.__delimiter.join
+        lineterminator = self.__lineterminator
+        encoding = self.__encoding
+
+        for row in rows:
+            buffer += (join(row) + lineterminator).encode(encoding)
+            if len(buffer) >= CSV_WRITE_BUFFER_SIZE:
+                self.flush()
+
+    def flush(self) -> None:
+        self.__output.write(self.__buffer)
+        self.__output.flush()
+        self.__buffer.clear()
+
+
+# check that values can be written as is, i.e. `csv.writer` wouldn't quote any of them
+def is_csv_safe(values: t.Iterable[str], delimiter: str | None = None) -> bool:
+    search = _compile_unsafe_chars(delimiter or ",").search
+    return all(value and search(value) is None for value in values)
+
 
 @contextmanager
-def use_csv_writer(
+def use_csv_writer(  # noqa: PLR0913
     dest: Path | None,
-    fieldnames: t.Sequence[str],
+    header: t.Sequence[str],
     delimiter: str | None = None,
-) -> t.Iterator[csv.DictWriter[str]]:
-    with dest.open("w") if dest is not None else nullcontext(sys.stdout) as fd:
-        writer = csv.DictWriter(
-            fd,
-            fieldnames=fieldnames,
-            delimiter=delimiter or ",",
-        )
-        writer.writeheader()
+    *,
+    lineterminator: str = CSV_LINE_TERMINATOR,
+    encoding: str | None = None,
+    unquoted: bool = False,
+) -> t.Iterator[RowWriter]:
+    # destination file is written with the specified encoding (locale encoding by default), stdout keeps its own one
+    # stdout may be replaced with a text only stream (e.g. in tests), then rows are written with `csv.writer`
+    if unquoted and (dest is not None or hasattr(sys.stdout, "buffer")):
+        # caller guarantees that all values are safe (see `is_csv_safe`), so quoting checks can be skipped
+        with _use_binary_output(dest, encoding) as (output, output_encoding):
+            unquoted_writer = UnquotedRowWriter(output, delimiter or ",", lineterminator, output_encoding)
+            unquoted_writer.writerow(header)
+
+            yield unquoted_writer
+
+            # rows buffered before an error are dropped, so partial output is not written
+            unquoted_writer.flush()
+
+        return
+
+    text_output = (
+        dest.open("w", newline="", buffering=CSV_WRITE_BUFFER_SIZE, encoding=encoding)
+        if dest is not None
+        else nullcontext(sys.stdout)
+    )
+
+    with text_output as fd:
+        writer = csv.writer(fd, delimiter=delimiter or ",", lineterminator=lineterminator)
+        writer.writerow(header)
 
         yield writer
+
+
+@contextmanager
+def _use_binary_output(dest: Path | None, encoding: str | None) -> t.Iterator[tuple[t.BinaryIO, str]]:
+    # keep the same encoding as text output would use
+    if dest is not None:
+        with dest.open("wb") as fd:
+            yield fd, encoding or locale.getpreferredencoding(do_setlocale=False)
+
+    else:
+        # text written to stdout before must go first
+        sys.stdout.flush()
+        yield sys.stdout.buffer, sys.stdout.encoding
+
+
+@cache
+def _compile_unsafe_chars(delimiter: str) -> re.Pattern[str]:
+    return re.compile(f'[{re.escape(delimiter)}"\r\n]')
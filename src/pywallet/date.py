@@ -3,17 +3,17 @@ from __future__ import annotations
 import typing as t
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, timedelta
-from functools import cached_property
+from functools import lru_cache
 
 type DatePeriodKind = t.Literal["day", "week", "month", "quarter", "year"]
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class DatePeriod:
     kind: DatePeriodKind
     start: date
 
-    @cached_property
+    @property
     def end(self) -> date:
         return get_relative_date(self.start, self.kind)
 
@@ -28,18 +28,18 @@ class DatePeriod:
 
 def get_relative_date(value: date, kind: DatePeriodKind, n: int = 1) -> date:
     if kind == "day":
-        return value + timedelta(days=1)
+        return value + timedelta(days=n)
 
     elif kind == "week":
-        return value + timedelta(days=7)
+        return value + timedelta(days=7 * n)
 
     if kind == "month":
-        year, month = divmod(value.year * 12 + value.month - 1 + n, 12)
-        return value.replace(year=year, month=month + 1)
+        year, month = _get_relative_month(value.year, value.month, n)
+        return value.replace(year=year, month=month)
 
     if kind == "quarter":
-        quarters, mod = divmod(value.year * 4 + value.month - 1 + n, 4)
-        return value.replace(year=quarters * 4, month=mod + 1)
+        year, month = _get_relative_month(value.year, value.month, 3 * n)
+        return value.replace(year=year, month=month)
 
     elif kind == "year":
         return value.replace(year=value.year + n)
@@ -48,17 +48,24 @@ def get_relative_date(value: date, kind: DatePeriodKind, n: int = 1) -> date:
         t.assert_never(kind)
 
 
+@lru_cache(maxsize=4096)
+def _get_relative_month(year: int, month: int, n: int) -> tuple[int, int]:
+    year, month = divmod(year * 12 + month - 1 + n, 12)
+    return year, month + 1
+
+
 def date_range(start: date, end: date, step: timedelta | DatePeriodKind) -> t.Iterable[date]:
     s = start
 
-    while True:
-        e = s + step if isinstance(step, timedelta) else get_relative_date(s, step)
+    if isinstance(step, timedelta):
+        while (e := s + step) <= end:
+            yield s
+            s = e
 
-        if e > end:
-            break
-
-        yield s
-        s = e
+    else:
+        while (e := get_relative_date(s, step)) <= end:
+            yield s
+            s = e
 
 
 def period_range(start: date, end: date, kind: DatePeriodKind) -> t.Iterable[DatePeriod]:
@@ -7,7 +7,7 @@ if t.TYPE_CHECKING:
     from decimal import Decimal
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class Money:
     currency: str
     amount: Decimal
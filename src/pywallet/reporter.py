@@ -1,39 +1,65 @@
 from __future__ import annotations
 
 import logging
-import math
 import typing as t
 from argparse import ArgumentParser, BooleanOptionalAction
-from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from dataclasses import dataclass
-from datetime import date
-from functools import singledispatch
-from itertools import batched
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import cache, lru_cache
 from pathlib import Path
+from queue import Queue
 
-import tqdm
-from no_log_tears import get_logger
-from pydantic import BaseModel, RootModel
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import BaseModel
 
-from pywallet.client import Client, ClientConfig, IncomesExpensesReportOptions, create_client
-from pywallet.csv import use_csv_writer
+from pywallet.cli import parse_positive_int
+from pywallet.config import ClientConfig
+from pywallet.csv import is_csv_safe, use_csv_writer
 from pywallet.date import DatePeriod, DatePeriodKind, get_relative_date, get_utc_today, period_range
 
 if t.TYPE_CHECKING:
-    from pywallet.money import Money
+    from pywallet.client import Client, IncomesExpensesReport
 
+CURRENT_PERIOD_REPORT_CACHE_TTL = timedelta(hours=1)
+CLOSED_PERIOD_REPORT_CACHE_TTL = timedelta(days=30)
+# transactions may be synchronized or edited some time after the period end
+CLOSED_PERIOD_GRACE = timedelta(days=7)
+
+# amounts are written as decimal strings
+_DECIMAL_CHARS = frozenset("0123456789+-.E")
+
+
+class Config(ClientConfig):
+    cache_dir: Path = Path.home() / ".cache" / "pywallet"
+
+
+# selenium, tqdm & pydantic settings are heavy to import, so they are imported only when report is made, this keeps
+# CLI `--help` and argument errors fast
+@cache
+def _get_config_cls() -> t.Callable[..., Config]:
+    from pydantic_settings import BaseSettings, SettingsConfigDict
+
+    class Settings(Config, BaseSettings):
+        model_config = SettingsConfigDict(
+            env_file=".env",
+        )
+
+    return Settings
 
-class Config(ClientConfig, BaseSettings):
-    model_config = SettingsConfigDict(
-        env_file=".env",
-    )
+
+# settings are read from environment & `.env` file on each config instantiation, so read them only once
+@cache
+def _get_config(*, headless: bool, login_progress: bool) -> Config:
+    return _get_config_cls()(browser_headless=headless, login_progress=login_progress)
 
 
 class BaseOptions(BaseModel):
     headless: bool
     progress: bool
     verbose: int
+    jobs: int
 
     @property
     def logging_level(self) -> int:
@@ -74,13 +100,11 @@ class PeriodOptions(BaseModel):
 
 class IncomesExpensesTableByPeriodsOptions(BaseOptions, PeriodOptions, CSVOptions):
     filter: str | None
+    cache: bool
+    refresh_cache: bool
 
 
-type ReportOptions = IncomesExpensesTableByPeriodsOptions | None
-
-
-class CLIOptions(RootModel[ReportOptions]):
-    pass
+type ReportOptions = IncomesExpensesTableByPeriodsOptions
 
 
 def build_parser() -> ArgumentParser:
@@ -120,6 +144,13 @@ def build_parser() -> ArgumentParser:
         default=0,
         help="Enable verbose / debug messages.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=parse_positive_int,
+        default=1,
+        help="Amount of browser sessions to read reports concurrently. Default: %(default)s",
+    )
 
     sub = parser.add_subparsers(dest="report", help="Choose report kind.")
 
@@ -136,6 +167,18 @@ def build_parser() -> ArgumentParser:
     ie_table_by_periods.add_argument("--filter", type=str, default=None, help="Specify custom filter on report page.")
     ie_table_by_periods.add_argument("--date-format", type=str, default=None, help="Specify custom date format.")
     ie_table_by_periods.add_argument("--delimiter", type=str, default=None, help="Specify custom date format.")
+    ie_table_by_periods.add_argument(
+        "--cache",
+        action=BooleanOptionalAction,
+        default=True,
+        help="Reuse reports that were read by previous runs. Default: %(default)s",
+    )
+    ie_table_by_periods.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        default=False,
+        help="Read all reports again and overwrite the cached ones. Default: %(default)s",
+    )
     ie_table_by_periods.add_argument(
         "-b",
         "--by",
@@ -170,145 +213,274 @@ def build_parser() -> ArgumentParser:
     return parser
 
 
-@singledispatch
 def make_report(options: ReportOptions) -> None:
-    msg = "unsupported report"
-    raise TypeError(msg, options)
+    if isinstance(options, IncomesExpensesTableByPeriodsOptions):
+        make_incomes_expenses_table_by_months_report(options)
 
+    else:
+        t.assert_never(options)
 
-@make_report.register
-def make_incomes_expenses_table_by_months_report(options: IncomesExpensesTableByPeriodsOptions) -> None:
-    config = Config(browser_headless=options.headless, login_progress=options.progress)
 
-    with create_client(config) as client:
-        report = get_incomes_expenses_table_by_months_report(client, options)
+def make_incomes_expenses_table_by_months_report(options: IncomesExpensesTableByPeriodsOptions) -> None:
+    periods = list(options.period_range)
+    reports = read_incomes_expenses_reports(periods, options)
+    report = get_incomes_expenses_table_by_months_report(periods, reports)
 
     dump_csv(report, options)
 
 
-@dataclass(frozen=True, kw_only=True)
+@dataclass(frozen=True, kw_only=True, slots=True)
 class IncomesExpensesTableByPeriods:
-    @dataclass(frozen=True, kw_only=True)
-    class Cell:
-        category: str
-        period: DatePeriod
-        money: Money
-
     columns: t.Sequence[DatePeriod]
-    cells: t.Sequence[Cell]
+    # category sign: 1 for incomes, -1 for expenses, amounts are taken from the table of the sign first
+    categories: t.Mapping[str, int]
+    # report of each period (column), amounts are looked up row by row only when rows are iterated
+    reports: t.Sequence[IncomesExpensesReport]
 
     @property
     def size(self) -> tuple[int, int]:
-        return len(self.columns), int(math.ceil(len(self.cells) / len(self.columns)))
-
-    def iter_rows(self) -> t.Iterable[t.Sequence[Cell]]:
-        return batched(self.cells, len(self.columns))
+        return len(self.columns), len(self.categories)
+
+    def iter_rows(self) -> t.Iterator[tuple[str, t.Sequence[Decimal]]]:
+        incomes = [report.incomes.get for report in self.reports]
+        expenses = [report.expenses.get for report in self.reports]
+        zero = Decimal(0)
+
+        for cat, sign in self.categories.items():
+            yield (
+                cat,
+                [
+                    # category may be in incomes in one period and in expenses in another one, the category own table
+                    # wins when category is in both tables of the period, category may have no transactions as well
+                    cat_row.total.amount if (cat_row := get_own_row(cat) or get_other_row(cat)) is not None else zero
+                    for get_own_row, get_other_row in (
+                        zip(incomes, expenses, strict=True) if sign > 0 else zip(expenses, incomes, strict=True)
+                    )
+                ],
+            )
 
 
 def get_incomes_expenses_table_by_months_report(
-    client: Client,
-    options: IncomesExpensesTableByPeriodsOptions,
+    periods: t.Sequence[DatePeriod],
+    reports: t.Mapping[DatePeriod, IncomesExpensesReport],
 ) -> IncomesExpensesTableByPeriods:
-    periods = list(options.period_range)
-
-    reports = {
-        period: client.read_incomes_expenses_report_for_month(
-            month=period.start,
-            options=IncomesExpensesReportOptions(filter_name=options.filter),
-        )
-        for period in tqdm.tqdm(periods, desc="reading reports", disable=not options.progress)
-    }
-
-    categories = OrderedDict[str, int]()
+    # incomes win when category has both incomes & expenses
+    categories = dict[str, int]()
     for report in reports.values():
         for row in report.incomes.values():
             categories[row.category] = 1
         for row in report.expenses.values():
-            categories[row.category] = -1
+            categories.setdefault(row.category, -1)
 
-    def get_money_by_category(period: DatePeriod, cat: str, sign: int) -> Money:
-        if sign > 0:
-            return reports[period].incomes[cat].total
+    return IncomesExpensesTableByPeriods(
+        columns=periods,
+        categories=categories,
+        reports=[reports[period] for period in periods],
+    )
 
-        elif sign < 0:
-            return reports[period].expenses[cat].total
 
-        else:
-            raise ValueError(cat, sign)
+def read_incomes_expenses_reports(
+    periods: t.Sequence[DatePeriod],
+    options: IncomesExpensesTableByPeriodsOptions,
+) -> t.Mapping[DatePeriod, IncomesExpensesReport]:
+    from pywallet.cache import FileCache
+    from pywallet.client import IncomesExpensesReport, create_client
+
+    config = _get_config(headless=options.headless, login_progress=options.progress)
+    cache = FileCache[IncomesExpensesReport](config.cache_dir / "reports") if options.cache else None
+    # reports are cached per account, so switching credentials never shows reports of another account
+    cache_namespace = f"incomes-expenses|{config.budgetbackers_email}|{options.filter or ''}"
+
+    reports = dict[DatePeriod, IncomesExpensesReport]()
+
+    if cache is not None and not options.refresh_cache:
+        for period in periods:
+            report = cache.get(cache_namespace, get_period_cache_name(period))
+            if report is not None:
+                reports[period] = report
+
+    missing_periods = [period for period in periods if period not in reports]
+
+    if missing_periods:
+        today = get_utc_today()
+
+        def cache_report(period: DatePeriod, report: IncomesExpensesReport) -> None:
+            if cache is None:
+                return
+
+            cache.set(
+                cache_namespace,
+                get_period_cache_name(period),
+                report,
+                # reports of long closed periods rarely change, recent periods are still filled up
+                ttl=CLOSED_PERIOD_REPORT_CACHE_TTL
+                if period.end + CLOSED_PERIOD_GRACE <= today
+                else CURRENT_PERIOD_REPORT_CACHE_TTL,
+            )
 
-    return IncomesExpensesTableByPeriods(
-        columns=periods,
-        cells=[
-            IncomesExpensesTableByPeriods.Cell(
-                category=cat,
-                period=period,
-                money=get_money_by_category(period, cat, sign),
+        with ExitStack() as stack:
+            clients = [
+                stack.enter_context(create_client(get_job_config(config, i)))
+                for i in range(min(max(options.jobs, 1), len(missing_periods)))
+            ]
+            # each report is cached as soon as it is read, so reports read before a failure are not read again
+            missing_reports = read_incomes_expenses_reports_for_periods(
+                clients,
+                missing_periods,
+                options,
+                on_report=cache_report,
             )
-            for cat, sign in categories.items()
-            for period in periods
-        ],
-    )
 
+        reports.update(missing_reports)
+
+    return {period: reports[period] for period in periods}
+
+
+def get_job_config(config: Config, job: int) -> Config:
+    if job == 0:
+        return config
+
+    # each browser session needs its own data dir, job dirs are siblings, so no browser profile is nested in another one
+    data_dir = config.browser_data_dir
+    return config.model_copy(update={"browser_data_dir": data_dir.with_name(f"{data_dir.name}-job-{job}")})
+
+
+def get_period_cache_name(period: DatePeriod) -> str:
+    return f"{period.kind}-{period.start.isoformat()}"
+
+
+def read_incomes_expenses_reports_for_periods(
+    clients: t.Sequence[Client],
+    periods: t.Sequence[DatePeriod],
+    options: IncomesExpensesTableByPeriodsOptions,
+    on_report: t.Callable[[DatePeriod, IncomesExpensesReport], None] | None = None,
+) -> t.Mapping[DatePeriod, IncomesExpensesReport]:
+    from pywallet.client import Client, IncomesExpensesReportOptions
+
+    # each client owns a separate browser session, so reports are read concurrently, one per idle client
+    idle_clients = Queue[Client]()
+    for client in clients:
+        idle_clients.put(client)
+
+    def read_report(period: DatePeriod) -> IncomesExpensesReport:
+        client = idle_clients.get()
+        try:
+            return client.read_incomes_expenses_report_for_month(
+                month=period.start,
+                options=IncomesExpensesReportOptions(filter_name=options.filter),
+            )
+
+        finally:
+            idle_clients.put(client)
+
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        futures = {executor.submit(read_report, period): period for period in periods}
+
+        completed: t.Iterable[Future[IncomesExpensesReport]] = as_completed(futures)
+        if options.progress:
+            import tqdm
+
+            completed = tqdm.tqdm(completed, desc="reading reports", total=len(futures))
+
+        for future in completed:
+            report = future.result()
+            if on_report is not None:
+                on_report(futures[future], report)
+
+    return {period: future.result() for future, period in futures.items()}
+
+
+def dump_csv(obj: object, options: CSVOptions) -> None:
+    if isinstance(obj, IncomesExpensesTableByPeriods):
+        dump_csv_incomes_expenses_by_categories_and_periods_report(obj, options)
+        return
 
-@singledispatch
-def dump_csv(
-    obj: object,
-    options: CSVOptions,  # noqa: ARG001
-) -> None:
     msg = "unsupported type"
     raise TypeError(msg, obj)
 
 
-@dump_csv.register
 def dump_csv_incomes_expenses_by_categories_and_periods_report(
     obj: IncomesExpensesTableByPeriods,
     options: CSVOptions,
 ) -> None:
-    period_titles = OrderedDict((col, get_period_title(col, options)) for col in obj.columns)
+    header = ("category", *(get_period_title(col, options) for col in obj.columns))
 
     with use_csv_writer(
         dest=options.output,
-        fieldnames=("category", *period_titles.values()),
+        header=header,
         delimiter=options.delimiter,
+        # almost always nothing has to be quoted, then rows are just joined with delimiter
+        unquoted=_DECIMAL_CHARS.isdisjoint(options.delimiter or ",")
+        and is_csv_safe(header, options.delimiter)
+        and is_csv_safe(obj.categories, options.delimiter),
     ) as writer:
-        for row in tqdm.tqdm(obj.iter_rows(), desc="writing csv", total=obj.size[1], disable=not options.progress):
-            writer.writerow(
-                {
-                    "category": row[0].category,
-                    **{period_titles[cell.period]: str(cell.money.amount) for cell in row},
-                }
-            )
-
-
-def get_period_title(period: DatePeriod, options: CSVOptions) -> str:
-    if options.date_format is not None:
-        return options.date_format.format(period)
+        rows: t.Iterable[t.Sequence[str]] = iter_csv_rows(obj)
+        if options.progress:
+            import tqdm
 
-    if period.kind == "day":
-        return f"{period.start:%Y.%m.%d}"
+            rows = tqdm.tqdm(rows, desc="writing csv", total=obj.size[1])
 
-    elif period.kind == "week":
-        return f"{period.start:%Y.%m.%d}-{period.end:%Y.%m.%d}"
+        writer.writerows(rows)
 
-    elif period.kind == "month":
-        return f"{period.start:%Y.%m}"
 
-    elif period.kind == "quarter":
-        return f"{period.start:%Y.%m}-{period.end:%Y.%m}"
+def iter_csv_rows(obj: IncomesExpensesTableByPeriods) -> t.Iterator[t.Sequence[str]]:
+    for category, amounts in obj.iter_rows():
+        yield (category, *map(str, amounts))
 
-    elif period.kind == "year":
-        return f"{period.start:%Y}"
 
-    else:
-        t.assert_never(period.kind)
+def get_period_title(period: DatePeriod, options: CSVOptions) -> str:
+    return format_period_title(period, options.date_format)
+
+
+_DAY_FORMAT = "%Y.%m.%d"
+_MONTH_FORMAT = "%Y.%m"
+_YEAR_FORMAT = "%Y"
+
+_PERIOD_TITLE_FORMATTERS: t.Mapping[DatePeriodKind, t.Callable[[DatePeriod], str]] = {
+    "day": lambda period: period.start.strftime(_DAY_FORMAT),
+    "week": lambda period: f"{period.start.strftime(_DAY_FORMAT)}-{period.end.strftime(_DAY_FORMAT)}",
+    "month": lambda period: period.start.strftime(_MONTH_FORMAT),
+    "quarter": lambda period: f"{period.start.strftime(_MONTH_FORMAT)}-{period.end.strftime(_MONTH_FORMAT)}",
+    "year": lambda period: period.start.strftime(_YEAR_FORMAT),
+}
+
+
+@lru_cache(maxsize=512)
+def format_period_title(period: DatePeriod, date_format: str | None = None) -> str:
+    if date_format is not None:
+        return date_format.format(period)
+
+    return _PERIOD_TITLE_FORMATTERS[period.kind](period)
+
+
+def parse_report_options(parser: ArgumentParser) -> ReportOptions:
+    ns = parser.parse_args()
+
+    if ns.report not in {"incomes-expenses-by-periods", "iep"}:
+        parser.error("report kind was not specified")
+
+    return IncomesExpensesTableByPeriodsOptions(
+        headless=ns.headless,
+        progress=ns.progress,
+        verbose=ns.verbose,
+        jobs=ns.jobs,
+        by=ns.by,
+        last=ns.last,
+        since=ns.since,
+        period=ns.period,
+        date_format=ns.date_format,
+        delimiter=ns.delimiter,
+        output=ns.output,
+        filter=ns.filter,
+        cache=ns.cache,
+        refresh_cache=ns.refresh_cache,
+    )
 
 
 def main() -> None:
-    options = CLIOptions.model_validate(build_parser().parse_args().__dict__).root
+    options = parse_report_options(build_parser())
 
-    if options is None:
-        msg = "invalid options"
-        raise ValueError(msg)
+    from no_log_tears import get_logger
 
     get_logger(__name__).setLevel(options.logging_level)
     make_report(options)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from pywallet.cache import FileCache
+
+NOW = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture
+def now(monkeypatch: pytest.MonkeyPatch) -> list[datetime]:
+    current = [NOW]
+    monkeypatch.setattr("pywallet.cache.get_utc_now", lambda: current[0])
+    return current
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> FileCache[str]:
+    return FileCache[str](tmp_path)
+
+
+@pytest.mark.usefixtures("now")
+def test_get_returns_none_on_miss(cache: FileCache[str]) -> None:
+    assert cache.get("ns", "name") is None
+
+
+@pytest.mark.usefixtures("now")
+def test_get_returns_set_value(cache: FileCache[str]) -> None:
+    cache.set("ns", "name", "value")
+
+    assert cache.get("ns", "name") == "value"
+
+
+@pytest.mark.usefixtures("now")
+def test_namespaces_are_separated(cache: FileCache[str]) -> None:
+    cache.set("ns-1", "name", "value-1")
+    cache.set("ns-2", "name", "value-2")
+
+    assert (cache.get("ns-1", "name"), cache.get("ns-2", "name")) == ("value-1", "value-2")
+
+
+def test_entry_is_alive_within_ttl(cache: FileCache[str], now: list[datetime]) -> None:
+    cache.set("ns", "name", "value", ttl=timedelta(hours=1))
+    now[0] = NOW + timedelta(hours=1)
+
+    assert cache.get("ns", "name") == "value"
+
+
+def test_entry_expires_after_ttl(cache: FileCache[str], now: list[datetime], tmp_path: Path) -> None:
+    cache.set("ns", "name", "value", ttl=timedelta(hours=1))
+    now[0] = NOW + timedelta(hours=1, seconds=1)
+
+    assert cache.get("ns", "name") is None
+    assert not list(tmp_path.rglob("*.pkl"))
+
+
+def test_entry_without_ttl_never_expires(cache: FileCache[str], now: list[datetime]) -> None:
+    cache.set("ns", "name", "value")
+    now[0] = NOW + timedelta(days=10_000)
+
+    assert cache.get("ns", "name") == "value"
+
+
+@pytest.mark.usefixtures("now")
+def test_broken_entry_is_removed(cache: FileCache[str], tmp_path: Path) -> None:
+    cache.set("ns", "name", "value")
+    (path,) = tmp_path.rglob("*.pkl")
+    path.write_bytes(b"broken")
+
+    assert cache.get("ns", "name") is None
+    assert not path.exists()
+
+
+@pytest.mark.usefixtures("now")
+def test_set_replaces_entry_without_leaving_temporary_files(cache: FileCache[str], tmp_path: Path) -> None:
+    cache.set("ns", "name", "old")
+    cache.set("ns", "name", "new")
+
+    assert cache.get("ns", "name") == "new"
+    assert [path.suffix for path in tmp_path.rglob("*") if path.is_file()] == [".pkl"]
+
+
+@pytest.mark.usefixtures("now")
+def test_failed_set_keeps_previous_entry(cache: FileCache[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    cache.set("ns", "name", "old")
+
+    def fail_replace(self: Path, target: Path) -> Path:
+        raise OSError(self, target)
+
+    monkeypatch.setattr(Path, "replace", fail_replace)
+
+    with pytest.raises(OSError, match=r"name\.tmp"):
+        cache.set("ns", "name", "new")
+
+    assert cache.get("ns", "name") == "old"
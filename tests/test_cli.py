@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from argparse import ArgumentTypeError
+
+import pytest
+
+from pywallet.cli import parse_positive_int
+from pywallet.converter import build_parser as build_converter_parser
+from pywallet.reporter import build_parser as build_reporter_parser
+
+
+@pytest.mark.parametrize(("value", "expected"), [("1", 1), ("8", 8)])
+def test_parse_positive_int(value: str, expected: int) -> None:
+    assert parse_positive_int(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_parse_positive_int_rejects_not_positive(value: str) -> None:
+    with pytest.raises(ArgumentTypeError):
+        parse_positive_int(value)
+
+
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_converter_rejects_not_positive_jobs(value: str) -> None:
+    with pytest.raises(SystemExit):
+        build_converter_parser().parse_args(["--jobs", value, "options.yaml", "report.pdf"])
+
+
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_reporter_rejects_not_positive_jobs(value: str) -> None:
+    with pytest.raises(SystemExit):
+        build_reporter_parser().parse_args(["--jobs", value, "iep"])
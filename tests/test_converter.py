@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import typing as t
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pdfplumber
+import pytest
+from pdfplumber.utils.text import DEFAULT_X_TOLERANCE, WordExtractor
+
+from pywallet.converter import (
+    ConvertOptions,
+    PDFOptions,
+    PDFWordSearchOptions,
+    extract_pdf_page_table,
+    extract_pdf_page_words_on_lines_with,
+    get_table_areas_by_pages,
+    merge_multiline_rows,
+    read_pdf_table,
+    search_words_in_pdf,
+    write_report,
+)
+
+if t.TYPE_CHECKING:
+    from pdfplumber.pdf import PDF
+
+TABLE_PDF_PATH = Path(__file__).parent / "data" / "table.pdf"
+TABLE_OPTIONS = PDFOptions.TableOptions.model_validate(
+    {
+        "columns": [
+            {"name": "Date", "type": "date", "rename": None, "ignore_values": ["Page"]},
+            {"name": "Description", "rename": None, "merge": {"join": {"separator": " "}}},
+            {"name": "Amount", "type": "money", "rename": None},
+        ],
+        "footers": ["total"],
+    }
+)
+
+
+@pytest.fixture
+def table_pdf() -> t.Iterator[PDF]:
+    with pdfplumber.open(TABLE_PDF_PATH) as doc:
+        yield doc
+
+
+@pytest.mark.parametrize(
+    "texts",
+    [
+        pytest.param(["Date"], id="header"),
+        pytest.param(["shop 1", "total"], id="many"),
+        pytest.param(["more"], id="multiline cells"),
+        pytest.param(["not in pdf"], id="missing"),
+    ],
+)
+def test_extract_pdf_page_words_on_lines_with_returns_same_words_as_extract_words(
+    table_pdf: PDF,
+    texts: t.Sequence[str],
+) -> None:
+    extractor = WordExtractor(x_tolerance=DEFAULT_X_TOLERANCE, keep_blank_chars=True)
+
+    for page in table_pdf.pages:
+        words = list(extract_pdf_page_words_on_lines_with(page, extractor, texts))
+
+        assert [word for word in words if any(text in word["text"] for text in texts)] == [
+            word
+            for word in page.extract_words(x_tolerance=DEFAULT_X_TOLERANCE, keep_blank_chars=True)
+            if any(text in word["text"] for text in texts)
+        ]
+
+
+def test_search_words_in_pdf_finds_exact_and_substr_matches(table_pdf: PDF) -> None:
+    header = PDFWordSearchOptions(exact_match="Date")
+    footer = PDFWordSearchOptions(substr="total")
+
+    results = list(search_words_in_pdf(table_pdf, [header, footer], word_join_tolerance=None))
+
+    assert [(result.search, result.word, result.page) for result in results] == [
+        (header, "Date", 1),
+        (footer, "Page total end", 1),
+        (header, "Date", 2),
+        (footer, "Page total end", 2),
+    ]
+
+
+@pytest.mark.parametrize("index", [pytest.param(False, id="no index"), pytest.param(True, id="index")])
+@pytest.mark.parametrize(
+    "columns",
+    [pytest.param(None, id="all columns"), pytest.param(["amount", "date"], id="some columns")],
+)
+def test_write_report_writes_same_csv_as_to_csv(
+    tmp_path: Path,
+    index: bool,  # noqa: FBT001
+    columns: list[str] | None,
+) -> None:
+    df = pd.DataFrame(
+        {
+            "date": [pd.Timestamp("2024-02-03"), pd.NaT, pd.Timestamp("2024-01-01")],
+            "time": [pd.Timestamp("2024-02-03 10:30"), pd.Timestamp("2024-01-02"), pd.NaT],
+            "description": ['shop, "best"', None, "магазин"],
+            "amount": [Decimal("1.50"), Decimal(-2), None],
+            "rate": [1.5, float("nan"), 2.0],
+        }
+    )
+    expected_path = tmp_path / "expected.csv"
+    df.sort_values(by=["date"]).to_csv(expected_path, columns=columns, index=index)
+
+    write_report(
+        tmp_path / "report.pdf",
+        df,
+        ConvertOptions.WriteOptions.model_validate({"csv": {"sort_by": ["date"], "columns": columns, "index": index}}),
+    )
+
+    assert (tmp_path / "report.csv").read_bytes() == expected_path.read_bytes()
+
+
+@pytest.mark.parametrize(
+    ("table", "expected"),
+    [
+        pytest.param(
+            [
+                ["01.02.2024", "shop", "1,000.50 USD"],
+                [None, "more", None],
+                [None, "and more", None],
+                ["02.02.2024", "cafe", "-5 USD"],
+            ],
+            [
+                [datetime(2024, 2, 1), "shop more and more", Decimal("1000.50")],  # noqa: DTZ001
+                [datetime(2024, 2, 2), "cafe", Decimal(-5)],  # noqa: DTZ001
+            ],
+            id="multiline cells are joined",
+        ),
+        pytest.param(
+            [
+                ["01.02.2024", "shop", "1 USD"],
+                ["Page", "2", "of 3"],
+                [None, "more", None],
+            ],
+            [
+                [datetime(2024, 2, 1), "shop more", Decimal(1)],  # noqa: DTZ001
+            ],
+            id="ignored values",
+        ),
+        pytest.param(
+            [
+                [None, "before", None],
+                ["01.02.2024", "shop", "1 USD"],
+            ],
+            [
+                [datetime(2024, 2, 1), "shop", Decimal(1)],  # noqa: DTZ001
+            ],
+            id="first row without required values is dropped",
+        ),
+        pytest.param(
+            [
+                ["01.02.2024", "shop", "1 USD"],
+                ["Date", "Description", "Amount"],
+                [None, "more", None],
+                ["02.02.2024", "cafe", "2 USD"],
+            ],
+            [
+                [datetime(2024, 2, 1), "shop more", Decimal(1)],  # noqa: DTZ001
+                [datetime(2024, 2, 2), "cafe", Decimal(2)],  # noqa: DTZ001
+            ],
+            id="failed start row is skipped & previous row is written once",
+        ),
+    ],
+)
+def test_merge_multiline_rows(table: list[list[str | None]], expected: list[list[object]]) -> None:
+    assert merge_multiline_rows(pd.DataFrame(table), TABLE_OPTIONS) == expected
+
+
+def test_extract_pdf_page_table_finds_table_with_all_columns(table_pdf: PDF) -> None:
+    areas = get_table_areas_by_pages(table_pdf, TABLE_OPTIONS)
+
+    assert list(areas) == [1, 2]
+
+    for page, area in areas.items():
+        table = extract_pdf_page_table(table_pdf.pages[page - 1], area, TABLE_OPTIONS.word_join_tolerance)
+
+        assert table is not None
+        assert table.shape == (11, len(TABLE_OPTIONS.columns))
+        assert table.iloc[0].tolist() == ["Date", "Description", "Amount"]
+
+
+def test_read_pdf_table_with_pdfplumber_extractor(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail_tabula(*args: object) -> t.NoReturn:
+        msg = "tabula fallback was used"
+        raise AssertionError(msg, args)
+
+    monkeypatch.setattr("pywallet.converter.read_pdf_page_tables_with_tabula", fail_tabula)
+
+    df = read_pdf_table(TABLE_PDF_PATH, TABLE_OPTIONS.model_copy(update={"extractor": "pdfplumber"}))
+
+    assert df.to_numpy().tolist() == [
+        [pd.Timestamp(2024, 2, day), f"shop {i} more {i}", Decimal(f"{i + 1}000.50")]
+        for _ in range(2)
+        for i, day in enumerate(range(1, 6))
+    ]
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import csv
+import io
+import typing as t
+
+import pytest
+
+from pywallet.csv import is_csv_safe, use_csv_writer
+
+if t.TYPE_CHECKING:
+    from pathlib import Path
+
+HEADER = ("category", "2024.01", "2024.02")
+ROWS = [
+    ("Income", "1.10", "2.10"),
+    ("Food & Beverages", "-1.5", "0"),
+    ("Life and Entertainment", "-1E+3", "-0.01"),
+    ("Кафе", "1000.50", "3"),
+]
+
+
+@pytest.mark.parametrize("delimiter", [None, ";", "\t", "|"])
+@pytest.mark.parametrize("lineterminator", ["\r\n", "\n"])
+def test_unquoted_writer_writes_same_bytes_as_csv_writer(
+    tmp_path: Path,
+    delimiter: str | None,
+    lineterminator: str,
+) -> None:
+    outputs = list[bytes]()
+
+    for unquoted in (False, True):
+        path = tmp_path / f"{unquoted}.csv"
+        with use_csv_writer(path, HEADER, delimiter, lineterminator=lineterminator, unquoted=unquoted) as writer:
+            writer.writerows(ROWS[:2])
+            writer.writerow(ROWS[2])
+            writer.writerows(iter(ROWS[3:]))
+
+        outputs.append(path.read_bytes())
+
+    assert outputs[0] == outputs[1]
+
+
+@pytest.mark.parametrize("delimiter", [",", ";", "\t"])
+@pytest.mark.parametrize(
+    "value",
+    [
+        "Income",
+        "Food & Beverages",
+        "-1000.50",
+        " spaces around ",
+        "Communication, PC",
+        "Shopping; other",
+        "tab\tseparated",
+        'quoted "name"',
+        "multi\nline",
+        "carriage\rreturn",
+        "",
+    ],
+)
+def test_is_csv_safe_matches_csv_writer_quoting(delimiter: str, value: str) -> None:
+    output = io.StringIO()
+    csv.writer(output, delimiter=delimiter, lineterminator="\r\n").writerow([value])
+
+    assert is_csv_safe([value], delimiter) is (output.getvalue() == f"{value}\r\n")
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from pywallet.date import DatePeriodKind, get_relative_date
+
+
+@pytest.mark.parametrize(
+    ("value", "kind", "n", "expected"),
+    [
+        pytest.param(date(2024, 1, 31), "day", 1, date(2024, 2, 1), id="next day"),
+        pytest.param(date(2024, 3, 1), "day", -1, date(2024, 2, 29), id="previous day in leap year"),
+        pytest.param(date(2024, 1, 1), "day", 45, date(2024, 2, 15), id="many days"),
+        pytest.param(date(2024, 1, 1), "week", 1, date(2024, 1, 8), id="next week"),
+        pytest.param(date(2024, 1, 1), "week", -3, date(2023, 12, 11), id="previous weeks"),
+        pytest.param(date(2024, 1, 15), "month", 1, date(2024, 2, 15), id="next month"),
+        pytest.param(date(2024, 1, 15), "month", -1, date(2023, 12, 15), id="previous month"),
+        pytest.param(date(2024, 11, 1), "month", 14, date(2026, 1, 1), id="many months"),
+        pytest.param(date(2024, 1, 1), "quarter", 1, date(2024, 4, 1), id="next quarter"),
+        pytest.param(date(2024, 1, 1), "quarter", -1, date(2023, 10, 1), id="previous quarter"),
+        pytest.param(date(2024, 10, 1), "quarter", 3, date(2025, 7, 1), id="many quarters"),
+        pytest.param(date(2024, 6, 1), "year", 1, date(2025, 6, 1), id="next year"),
+        pytest.param(date(2024, 6, 1), "year", -2, date(2022, 6, 1), id="previous years"),
+    ],
+)
+def test_get_relative_date(value: date, kind: DatePeriodKind, n: int, expected: date) -> None:
+    assert get_relative_date(value, kind, n) == expected
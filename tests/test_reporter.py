@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from pywallet.client import IncomesExpensesReport
+from pywallet.date import DatePeriod
+from pywallet.money import Money
+from pywallet.reporter import get_incomes_expenses_table_by_months_report
+
+JAN = DatePeriod(kind="month", start=date(2024, 1, 1))
+FEB = DatePeriod(kind="month", start=date(2024, 2, 1))
+MAR = DatePeriod(kind="month", start=date(2024, 3, 1))
+
+
+def create_report(
+    period: DatePeriod,
+    incomes: dict[str, str] | None = None,
+    expenses: dict[str, str] | None = None,
+) -> IncomesExpensesReport:
+    def create_rows(amounts: dict[str, str] | None) -> dict[str, IncomesExpensesReport.Row]:
+        return {
+            category: IncomesExpensesReport.Row(category=category, total=Money(currency="$", amount=Decimal(amount)))
+            for category, amount in (amounts or {}).items()
+        }
+
+    return IncomesExpensesReport(
+        title=f"{period.start}",
+        total=Money(currency="$", amount=Decimal(0)),
+        period=period,
+        incomes=create_rows(incomes),
+        expenses=create_rows(expenses),
+    )
+
+
+@pytest.mark.parametrize(
+    ("reports", "expected"),
+    [
+        pytest.param(
+            [
+                create_report(JAN, incomes={"Salary": "10"}, expenses={"Food": "-1"}),
+                create_report(FEB, incomes={"Salary": "20"}, expenses={"Food": "-2"}),
+            ],
+            [
+                ("Salary", [Decimal(10), Decimal(20)]),
+                ("Food", [Decimal(-1), Decimal(-2)]),
+            ],
+            id="all categories in all periods",
+        ),
+        pytest.param(
+            [
+                create_report(JAN, expenses={"Food": "-1", "Travel": "-5"}),
+                create_report(FEB, incomes={"Gift": "3"}, expenses={"Food": "-2"}),
+                create_report(MAR),
+            ],
+            [
+                ("Food", [Decimal(-1), Decimal(-2), Decimal(0)]),
+                ("Travel", [Decimal(-5), Decimal(0), Decimal(0)]),
+                ("Gift", [Decimal(0), Decimal(3), Decimal(0)]),
+            ],
+            id="categories missing in some periods are zero filled",
+        ),
+    ],
+)
+def test_table_rows_have_amount_for_each_period(
+    reports: list[IncomesExpensesReport],
+    expected: list[tuple[str, list[Decimal]]],
+) -> None:
+    table = get_incomes_expenses_table_by_months_report(
+        [report.period for report in reports],
+        {report.period: report for report in reports},
+    )
+
+    assert table.size == (len(reports), len(expected))
+    assert list(table.iter_rows()) == expected
+
+
+@pytest.mark.parametrize(
+    ("reports", "expected"),
+    [
+        pytest.param(
+            [
+                create_report(JAN, incomes={"Refunds": "4"}, expenses={"Refunds": "-1"}),
+                create_report(FEB, expenses={"Refunds": "-2"}),
+            ],
+            [Decimal(4), Decimal(-2)],
+            id="both in one period",
+        ),
+        pytest.param(
+            [
+                create_report(JAN, expenses={"Refunds": "-1"}),
+                create_report(FEB, incomes={"Refunds": "4"}, expenses={"Refunds": "-2"}),
+            ],
+            [Decimal(-1), Decimal(4)],
+            id="incomes appear later",
+        ),
+        pytest.param(
+            [
+                create_report(JAN, expenses={"Refunds": "-1.15"}),
+                create_report(FEB, expenses={"Refunds": "-2.87"}),
+                create_report(MAR, incomes={"Refunds": "3.24"}),
+            ],
+            [Decimal("-1.15"), Decimal("-2.87"), Decimal("3.24")],
+            id="incomes & expenses in different periods",
+        ),
+        pytest.param(
+            [
+                create_report(JAN, incomes={"Refunds": "4"}),
+                create_report(FEB),
+                create_report(MAR, expenses={"Refunds": "-2"}),
+            ],
+            [Decimal(4), Decimal(0), Decimal(-2)],
+            id="missing in some periods",
+        ),
+    ],
+)
+def test_category_with_incomes_and_expenses_keeps_amounts_of_each_period(
+    reports: list[IncomesExpensesReport],
+    expected: list[Decimal],
+) -> None:
+    table = get_incomes_expenses_table_by_months_report(
+        [report.period for report in reports],
+        {report.period: report for report in reports},
+    )
+
+    assert list(table.iter_rows()) == [("Refunds", expected)]